@@ -1,88 +1,626 @@
-import whisper
 import os
 import argparse
+import hashlib
+import io
+import multiprocessing
+import itertools
+import logging
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import ctranslate2
+import numpy as np
 import torch
+import torchaudio
 from tqdm import tqdm
 import soundfile as sf
 import noisereduce as nr
+from noisereduce.torchgate import TorchGate
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
 # Impor library baru untuk summarization
-from transformers import pipeline, logging
+from transformers import AutoConfig, AutoTokenizer, pipeline
+from transformers import logging as hf_logging
+from transformers.modeling_outputs import BaseModelOutput
 
 # Menyembunyikan pesan logging yang tidak perlu dari transformers
-logging.set_verbosity_error()
+hf_logging.set_verbosity_error()
 
-def summarize_text(text: str, summarizer, max_chunk_length: int = 512) -> str:
+logger = logging.getLogger(__name__)
+
+
+class TqdmLoggingHandler(logging.Handler):
+    """
+    Handler logging yang mencetak lewat tqdm.write agar progress bar tidak rusak atau digambar ulang.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        tqdm.write(self.format(record))
+
+
+def configure_logging() -> None:
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[TqdmLoggingHandler()])
+    # faster-whisper mencatat durasi/VAD setiap file di level INFO; cukup tampilkan peringatan
+    logging.getLogger("faster_whisper").setLevel(logging.WARNING)
+
+# Model summarization, ukuran batch pipeline, dan panjang input maksimum T5
+SUMMARIZER_MODEL = "Falconsai/text_summarization"
+SUMMARIZER_BATCH_SIZE = 8
+SUMMARIZER_MAX_INPUT_LENGTH = 512
+
+
+class CUDAGraphEncoder(torch.nn.Module):
+    """
+    Pembungkus encoder T5 yang menjalankan forward pass lewat CUDA graph berbentuk tetap.
+
+    Input dipad ke [batch_size, max_length] lalu disalin ke buffer statis, sehingga setiap
+    panggilan hanyalah replay kernel yang sudah direkam. Input yang lebih besar dari bentuk
+    tersebut (atau yang meminta output tambahan) dijalankan secara eager seperti biasa.
+    Decoder tetap eager karena panjang keluarannya bervariasi.
+    """
+
+    def __init__(self, encoder: torch.nn.Module, batch_size: int, max_length: int, device: str, pad_token_id: int = 0):
+        super().__init__()
+        self.encoder = encoder
+        self.pad_token_id = pad_token_id
+        self.static_input_ids = torch.full((batch_size, max_length), pad_token_id, dtype=torch.long, device=device)
+        self.static_attention_mask = torch.ones((batch_size, max_length), dtype=torch.long, device=device)
+
+        with torch.no_grad():
+            # Pemanasan di stream terpisah sesuai syarat torch.cuda.graph
+            stream = torch.cuda.Stream(device)
+            stream.wait_stream(torch.cuda.current_stream(device))
+            with torch.cuda.stream(stream):
+                for _ in range(3):
+                    self.encoder(input_ids=self.static_input_ids, attention_mask=self.static_attention_mask, return_dict=True)
+            torch.cuda.current_stream(device).wait_stream(stream)
+
+            self.graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(self.graph):
+                self.static_output = self.encoder(
+                    input_ids=self.static_input_ids, attention_mask=self.static_attention_mask, return_dict=True
+                ).last_hidden_state
+
+    def forward(self, input_ids=None, attention_mask=None, **kwargs):
+        static_batch, static_length = self.static_input_ids.shape
+        if (
+            input_ids is None
+            or input_ids.shape[0] > static_batch
+            or input_ids.shape[1] > static_length
+            or kwargs.get("output_attentions")
+            or kwargs.get("output_hidden_states")
+        ):
+            return self.encoder(input_ids=input_ids, attention_mask=attention_mask, **kwargs)
+
+        batch, length = input_ids.shape
+        self.static_input_ids.fill_(self.pad_token_id)
+        self.static_attention_mask.zero_()
+        self.static_input_ids[:batch, :length].copy_(input_ids)
+        if attention_mask is None:
+            self.static_attention_mask[:batch, :length].fill_(1)
+        else:
+            self.static_attention_mask[:batch, :length].copy_(attention_mask)
+        self.graph.replay()
+        # Posisi padding di-mask, jadi hidden state untuk token asli sama dengan hasil tanpa padding
+        return BaseModelOutput(last_hidden_state=self.static_output[:batch, :length].clone())
+
+
+class CT2Summarizer:
+    """
+    Backend summarization dengan CTranslate2 untuk model T5 yang sudah dikonversi, misalnya:
+
+        ct2-transformers-converter --model Falconsai/text_summarization --output_dir ct2-t5-falconsai --quantization int8_float16 \
+            --copy_files tokenizer.json tokenizer_config.json special_tokens_map.json
+
+    Tokenizer dimuat dari folder model jika file tokenizer ikut disalin (wajib untuk model T5
+    selain Falconsai, mis. flan-t5); jika tidak ada, dipakai tokenizer SUMMARIZER_MODEL.
+
+    Bisa dipanggil seperti pipeline summarization transformers (menerima list teks dan
+    mengembalikan list {"summary_text": ...}) dan punya atribut tokenizer, sehingga
+    summarize_text tidak perlu tahu backend mana yang dipakai.
+    """
+
+    def __init__(self, model_dir: str, device: str, device_index: int = 0):
+        has_tokenizer = any(
+            os.path.exists(os.path.join(model_dir, name))
+            for name in ("tokenizer.json", "tokenizer_config.json", "spiece.model")
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir if has_tokenizer else SUMMARIZER_MODEL)
+        # Parameter generate bawaan model (task_specific_params) yang juga dipakai pipeline transformers.
+        # config.json di folder CT2 adalah milik CTranslate2, jadi jika tidak terbaca pakai SUMMARIZER_MODEL.
+        try:
+            config = AutoConfig.from_pretrained(model_dir)
+        except (OSError, ValueError):
+            config = AutoConfig.from_pretrained(SUMMARIZER_MODEL)
+        params = (getattr(config, "task_specific_params", None) or {}).get("summarization", {})
+        self.no_repeat_ngram_size = params.get("no_repeat_ngram_size", 0)
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+        self.translator = ctranslate2.Translator(model_dir, device=device, device_index=device_index, compute_type=compute_type)
+
+    def __call__(self, texts: list[str], max_length: int = 150, min_length: int = 30, **kwargs) -> list[dict]:
+        # Pipeline transformers menambahkan prefix tugas T5 secara otomatis; di sini harus manual
+        source_tokens = [
+            self.tokenizer.convert_ids_to_tokens(self.tokenizer.encode("summarize: " + text))
+            for text in texts
+        ]
+        results = self.translator.translate_batch(
+            source_tokens,
+            max_batch_size=SUMMARIZER_BATCH_SIZE,
+            beam_size=1,
+            max_decoding_length=max_length,
+            min_decoding_length=min_length,
+            no_repeat_ngram_size=self.no_repeat_ngram_size,
+        )
+        return [
+            {"summary_text": self.tokenizer.decode(
+                self.tokenizer.convert_tokens_to_ids(result.hypotheses[0]), skip_special_tokens=True
+            )}
+            for result in results
+        ]
+
+
+def summarize_text(text: str, summarizer, max_chunk_length: int = 480) -> str | None:
     """
     Membuat ringkasan dari teks yang panjang dengan membaginya menjadi beberapa bagian.
 
     Args:
         text (str): Teks lengkap yang akan diringkas.
-        summarizer: Model pipeline summarization dari transformers.
-        max_chunk_length (int): Panjang maksimum setiap potongan teks. Model T5 memiliki batas sekitar 512 token.
+        summarizer: Model pipeline summarization dari transformers, atau CT2Summarizer.
+        max_chunk_length (int): Jumlah token maksimum setiap potongan teks. Model T5 memiliki batas 512 token;
+            sisanya disediakan untuk prefix "summarize: " dan token EOS.
 
     Returns:
-        str: Teks ringkasan yang sudah digabungkan.
+        str | None: Teks ringkasan yang sudah digabungkan, atau None jika gagal.
     """
     try:
-        print("\n🔄 Membuat ringkasan...")
-        # Pisahkan teks menjadi potongan-potongan (chunks) yang lebih kecil
-        # Ini adalah cara sederhana, bisa disempurnakan dengan tokenizer jika perlu
-        words = text.split()
-        chunks = [' '.join(words[i:i + max_chunk_length]) for i in range(0, len(words), max_chunk_length)]
-
-        # Buat ringkasan untuk setiap chunk
-        summaries = summarizer(chunks, max_length=150, min_length=30, do_sample=False)
+        logger.debug("🔄 Membuat ringkasan...")
+        # Pisahkan teks menjadi potongan berdasarkan token sub-kata milik model itu sendiri,
+        # bukan per kata, agar tidak ada potongan yang terpotong diam-diam oleh batas 512 token
+        tokenizer = summarizer.tokenizer
+        token_ids = tokenizer(text, add_special_tokens=False, truncation=False)["input_ids"]
+        chunks = [
+            tokenizer.decode(token_ids[i:i + max_chunk_length], skip_special_tokens=True)
+            for i in range(0, len(token_ids), max_chunk_length)
+        ]
+
+        # Buat ringkasan untuk semua chunk sekaligus; pipeline mengelompokkannya per batch di GPU.
+        # inference_mode lebih ketat dari no_grad bawaan pipeline: tanpa pencatatan version counter.
+        with torch.inference_mode():
+            summaries = summarizer(chunks, max_length=150, min_length=30, do_sample=False)
         
         # Gabungkan semua ringkasan
         full_summary = ' '.join([summ['summary_text'] for summ in summaries])
-        print("✅ Ringkasan selesai.")
+        logger.debug("✅ Ringkasan selesai.")
         return full_summary
     except Exception as e:
-        print(f"❌ Gagal membuat ringkasan: {e}")
-        return "[Gagal membuat ringkasan]"
+        tqdm.write(f"❌ Gagal membuat ringkasan: {e}")
+        return None
+
+
+# Whisper bekerja pada audio mono 16 kHz
+WHISPER_SAMPLE_RATE = 16000
+
+# Instance TorchGate per (sample rate, perangkat), dipakai ulang antar file agar plan cuFFT tidak dibuat ulang
+_torch_gates: dict[tuple[int, str], TorchGate] = {}
+
+
+def _get_torch_gate(rate: int, device: str) -> TorchGate:
+    key = (rate, device)
+    if key not in _torch_gates:
+        # Non-stasioner, sama dengan default nr.reduce_noise di jalur CPU dan fallback OOM,
+        # agar hasil pembersihan tidak bergantung pada perangkat yang dipakai
+        _torch_gates[key] = TorchGate(sr=rate, nonstationary=True).to(device)
+    return _torch_gates[key]
+
+
+def load_audio_fast(file_path: str) -> np.ndarray:
+    """
+    Mendekode file audio/video menjadi mono 16 kHz sepenuhnya di dalam proses Python.
+
+    Format yang didukung libsndfile (wav, mp3, ...) dibaca dengan soundfile lalu di-resample
+    dengan torchaudio. Kontainer lain (m4a, mp4, mkv, ...) didekode lewat PyAV milik
+    faster-whisper. Tidak ada subprocess ffmpeg yang dijalankan per file.
+
+    Returns:
+        np.ndarray: Audio mono 16 kHz (float32).
+    """
+    try:
+        data, rate = sf.read(file_path, dtype="float32", always_2d=True)
+    except RuntimeError:
+        return decode_audio(file_path, sampling_rate=WHISPER_SAMPLE_RATE)
+
+    audio = torch.from_numpy(data).mean(dim=1)
+    if rate != WHISPER_SAMPLE_RATE:
+        audio = torchaudio.functional.resample(audio, rate, WHISPER_SAMPLE_RATE)
+    return audio.numpy()
+
+
+def clean_audio(file_path: str, cleaned_audio_folder: str, device: str = "cpu", keep_cleaned: bool = False) -> np.ndarray:
+    """
+    Membersihkan noise dari satu file audio dan mengembalikannya langsung di memori.
+
+    Di CPU, dijalankan di proses worker terpisah dengan noisereduce biasa. Di GPU,
+    spectral gating dijalankan dengan TorchGate di perangkat CUDA yang juga dipakai Whisper.
+    Keduanya berjalan bersamaan dengan transkripsi file sebelumnya. Pembersihan dilakukan
+    pada audio 16 kHz, sample rate yang memang dipakai Whisper.
+
+    File WAV hasil pembersihan hanya ditulis jika keep_cleaned aktif, tetapi selalu dipakai
+    ulang jika sudah ada dari proses sebelumnya.
+
+    Returns:
+        np.ndarray: Audio mono 16 kHz (float32) yang sudah dibersihkan, siap untuk Whisper.
+    """
+    base_name_no_ext = os.path.splitext(os.path.basename(file_path))[0]
+    cleaned_audio_path = os.path.join(cleaned_audio_folder, f"{base_name_no_ext}_cleaned.wav")
+    if os.path.exists(cleaned_audio_path):
+        return load_audio_fast(cleaned_audio_path)
+
+    data = load_audio_fast(file_path)
+    reduced_noise_data = None
+    gpu_oom = False
+    if device != "cpu":
+        # TorchGate memproses seluruh file dalam satu STFT; rekaman berjam-jam bisa butuh
+        # beberapa GB di GPU yang sudah ditempati Whisper/T5. Jika tidak cukup, pakai jalur CPU
+        # noisereduce yang memproses sinyal per potongan.
+        audio = None
+        try:
+            with torch.inference_mode():
+                audio = torch.from_numpy(data).to(device)
+                reduced_noise_data = _get_torch_gate(WHISPER_SAMPLE_RATE, device)(audio.unsqueeze(0)).squeeze(0).cpu().numpy()
+        except torch.cuda.OutOfMemoryError:
+            gpu_oom = True
+        if gpu_oom:
+            # Dipanggil setelah blok except selesai: selama di dalamnya, traceback masih menahan
+            # frame TorchGate beserta tensor STFT/mask-nya sehingga memorinya belum bisa dilepas.
+            # Salinan input di GPU juga dilepas (bisa ratusan MB untuk rekaman panjang).
+            audio = None
+            torch.cuda.empty_cache()
+            tqdm.write(f"⚠️ Memori GPU tidak cukup untuk membersihkan {os.path.basename(file_path)}; memakai CPU.")
+    if reduced_noise_data is None:
+        reduced_noise_data = nr.reduce_noise(y=data, sr=WHISPER_SAMPLE_RATE).astype(np.float32)
+    if keep_cleaned:
+        sf.write(cleaned_audio_path, reduced_noise_data, WHISPER_SAMPLE_RATE)
+    return reduced_noise_data
+
+
+def prepare_audio(file_path: str, cleaned_audio_folder: str, device: str = "cpu", clean_noise: bool = False, keep_cleaned: bool = False) -> np.ndarray:
+    """
+    Menyiapkan audio mono 16 kHz untuk satu file sebelum transkripsi.
+
+    Returns:
+        np.ndarray: Audio float32 siap untuk Whisper, sudah dibersihkan jika clean_noise aktif.
+    """
+    if clean_noise:
+        return clean_audio(file_path, cleaned_audio_folder, device, keep_cleaned)
+    return load_audio_fast(file_path)
+
+
+# Batas jumlah proses worker persiapan audio di CPU
+MAX_AUDIO_WORKERS = 4
+
+
+def _init_audio_worker() -> None:
+    # Satu thread intra-op per worker agar tidak berebut core dengan CTranslate2 dan summarizer
+    torch.set_num_threads(1)
+
+
+def iter_prefetched(executor: Executor, fn, items: list, max_pending: int):
+    """
+    Menjalankan fn(*args) untuk setiap (key, args) di items pada executor dan menghasilkan
+    (key, future) sesuai urutan selesai.
+
+    Paling banyak max_pending tugas berjalan atau menunggu diambil sekaligus, sehingga
+    audio yang sudah didekode tidak menumpuk di memori saat transkripsi lebih lambat.
+    """
+    items = iter(items)
+    pending = {}
+    for key, fn_args in itertools.islice(items, max_pending):
+        pending[executor.submit(fn, *fn_args)] = key
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            key = pending.pop(future)
+            for next_key, fn_args in itertools.islice(items, 1):
+                pending[executor.submit(fn, *fn_args)] = next_key
+            yield key, future
+
+
+SUMMARY_MARKER = "--- RINGKASAN ---"
+TRANSCRIPT_MARKER = "--- TRANSKRIPSI LENGKAP ---"
+
+
+def transcript_digest(transcription: str) -> str:
+    """
+    Sidik jari pendek dari transkrip, disimpan di bawah ringkasan untuk mendeteksi ringkasan basi.
+    """
+    return hashlib.sha256(transcription.encode("utf-8")).hexdigest()[:16]
+
+
+def get_output_path(file_path: str, output_folder: str) -> str:
+    """
+    Menentukan path file .txt output untuk satu file audio/video.
+    """
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    if base_name.endswith('_cleaned'):
+        base_name = base_name[:-8]
+    return os.path.join(output_folder, f"{base_name}.txt")
 
 
-def transcribe_audio(model: whisper.Whisper, file_path: str, output_folder: str, language: str) -> tuple[bool, str, str]:
+def read_transcript(output_path: str) -> tuple[str, str]:
+    """
+    Membaca file output yang sudah ada dan memisahkannya di penanda transkrip.
+
+    Returns:
+        Tuple berisi (bagian_ringkasan, bagian_transkrip). bagian_ringkasan kosong jika file
+        hanya berisi transkrip.
+    """
+    with open(output_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    summary_section, _, transcript_section = content.rpartition(TRANSCRIPT_MARKER)
+    return summary_section, transcript_section
+
+
+def write_transcript(output_path: str, transcription: str, summary: str | None = None) -> None:
+    """
+    Menulis file output dalam satu kali buka: transkrip saja, atau ringkasan + transkrip.
+
+    Isi ditulis ke file sementara di folder yang sama lalu dipindahkan dengan os.replace,
+    sehingga file output tidak pernah tertinggal setengah tertulis jika proses terhenti.
+    """
+    if summary is not None:
+        # Digest dihitung dari teks yang sudah di-strip, sama seperti saat dicek di transcribe_audio;
+        # segmen terakhir yang kosong menyisakan "\n" di akhir transkrip dan membuat digest tidak cocok
+        content = (
+            f"{SUMMARY_MARKER}\n[sha256: {transcript_digest(transcription.strip())}]\n{summary}\n\n"
+            f"{TRANSCRIPT_MARKER}\n{transcription}"
+        )
+    else:
+        content = transcription
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def summarize_and_save(output_path: str, transcribed_text: str, formatted_transcription: str, summarizer) -> None:
+    """
+    Membuat ringkasan lalu menulis file output dengan format ringkasan + transkrip.
+
+    Jika ringkasan gagal, hanya transkrip yang ditulis (tanpa penanda ringkasan dan hash)
+    sehingga ringkasan dicoba lagi pada proses berikutnya.
+    """
+    summary = summarize_text(transcribed_text, summarizer)
+    write_transcript(output_path, formatted_transcription, summary)
+
+
+def transcribe_audio(model: WhisperModel | BatchedInferencePipeline, file_path: str, output_folder: str, language: str, batch_size: int = 1, audio: np.ndarray | None = None, save: bool = True) -> tuple[bool, str, str, str, bool]:
     """
     Mentranskripsi satu file audio/video dan menyimpannya sebagai file .txt.
 
+    Jika audio (mono 16 kHz) diberikan, audio itu yang ditranskripsi dan file_path hanya
+    dipakai untuk menentukan nama file output; decoding file dari disk dilewati.
+
+    Jika batch_size > 1, model harus berupa BatchedInferencePipeline: potongan hasil VAD
+    dari file yang sama dikirim ke encoder sekaligus dalam satu batch.
+
+    Jika save bernilai False, hasil tidak ditulis ke disk; pemanggil yang menuliskannya
+    (mis. bersama ringkasan) agar file output cukup ditulis sekali.
+
     Returns:
-        Tuple berisi (status_sukses, path_file_output, teks_transkripsi).
+        Tuple berisi (status_sukses, path_file_output, teks_transkripsi, transkripsi_berformat,
+        sudah_ada_ringkasan). sudah_ada_ringkasan hanya True jika file output sudah ada dengan
+        ringkasan yang dibuat dari transkrip yang sama persis.
     """
     full_text = ""
+    formatted_transcription = ""
     output_file_path = ""
     try:
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        if base_name.endswith('_cleaned'):
-            base_name = base_name[:-8]
-            
-        output_file_path = os.path.join(output_folder, f"{base_name}.txt")
-        
+        output_file_path = get_output_path(file_path, output_folder)
+
         if os.path.exists(output_file_path):
-            with open(output_file_path, 'r', encoding='utf-8') as f:
-                # Asumsikan file yang ada sudah lengkap (ringkasan + transkrip)
-                # atau hanya transkrip. Kita baca isinya untuk diringkas jika perlu.
-                full_text = f.read().split("--- TRANSKRIPSI LENGKAP ---")[-1].strip()
-            return True, output_file_path, full_text
+            # Asumsikan file yang ada sudah lengkap (ringkasan + transkrip)
+            # atau hanya transkrip. Kita baca isinya untuk diringkas jika perlu.
+            summary_section, transcript_section = read_transcript(output_file_path)
+            formatted_transcription = transcript_section.strip()
+            full_text = formatted_transcription
+            # Ringkasan tanpa hash atau dengan hash berbeda dianggap basi dan dibuat ulang
+            has_summary = (
+                SUMMARY_MARKER in summary_section
+                and f"[sha256: {transcript_digest(formatted_transcription)}]" in summary_section
+            )
+            return True, output_file_path, full_text, formatted_transcription, has_summary
 
-        result = model.transcribe(file_path, language=language, verbose=False)
-        
-        # Simpan teks lengkap untuk diringkas nanti
-        full_text = result.get("text", "")
+        # faster-whisper mengembalikan generator; decoding baru berjalan saat diiterasi
+        # Mode batch faster-whisper defaultnya without_timestamps=True (satu baris per potongan VAD
+        # hingga 30 detik); paksa timestamp per segmen agar format output sama dengan mode biasa
+        batch_kwargs = {"batch_size": batch_size, "without_timestamps": False} if batch_size > 1 else {}
+        segments, _info = model.transcribe(file_path if audio is None else audio, language=language, beam_size=5, vad_filter=True, **batch_kwargs)
 
-        formatted_transcription = "\n".join(
-            f"[{seg['start']:.2f}s - {seg['end']:.2f}s] {seg['text'].strip()}"
-            for seg in result.get("segments", [])
-        )
+        # Satu lintasan atas segmen: teks lengkap (untuk diringkas nanti) dan transkripsi
+        # berformat langsung ditulis ke buffer, tanpa list segmen atau list string perantara
+        text_buffer = io.StringIO()
+        formatted_buffer = io.StringIO()
+        write_text = text_buffer.write
+        write_formatted = formatted_buffer.write
+        for i, seg in enumerate(segments):
+            if i:
+                write_formatted("\n")
+            write_text(seg.text)
+            write_formatted(f"[{seg.start:.2f}s - {seg.end:.2f}s] {seg.text.strip()}")
+        full_text = text_buffer.getvalue()
+        formatted_transcription = formatted_buffer.getvalue()
 
-        with open(output_file_path, "w", encoding="utf-8") as f:
-            # Langsung tulis transkripsi lengkap saja
-            f.write(formatted_transcription)
+        if save:
+            write_transcript(output_file_path, formatted_transcription)
 
-        return True, output_file_path, full_text
+        return True, output_file_path, full_text, formatted_transcription, False
     except Exception as e:
-        print(f"\n❌ Gagal mentranskripsi {os.path.basename(file_path)}: {e}")
-        return False, output_file_path, full_text
+        tqdm.write(f"❌ Gagal mentranskripsi {os.path.basename(file_path)}: {e}")
+        return False, output_file_path, full_text, formatted_transcription, False
+
+
+def load_models(args: argparse.Namespace, device: str, device_index: int = 0):
+    """
+    Memuat model Whisper (dan model summarization jika diminta) pada satu perangkat.
+
+    Returns:
+        Tuple berisi (model_whisper, summarizer). summarizer bernilai None jika --summarize tidak aktif.
+    """
+    logger.info(f"📥 Memuat model Whisper ({args.model})...")
+    # CTranslate2 dengan kuantisasi INT8: bobot int8, aktivasi float16 di GPU
+    compute_type = "int8_float16" if device == "cuda" else "int8"
+    # Flash Attention (CTranslate2 >= 4.0, GPU Ampere ke atas) menghindari materialisasi matriks atensi
+    # [heads, T, T] di memori GPU; paling terasa di self-attention encoder dengan konteks 1500 frame.
+    model_kwargs = {"flash_attention": True} if device == "cuda" and args.flash_attention else {}
+    model = WhisperModel(args.model, device=device, device_index=device_index, compute_type=compute_type, **model_kwargs)
+    # Decoder CTranslate2 sudah berupa kernel C++ tanpa overhead dispatch Python per token,
+    # jadi yang tersisa hanyalah biaya inisialisasi pada panggilan pertama: kernel/alokator
+    # encoder-decoder dan sesi ONNX Silero VAD. Bayar di sini, bukan pada file pertama.
+    # Audio hening tidak lolos VAD, jadi encoder-decoder dipanaskan dengan panggilan tanpa VAD.
+    warmup_audio = np.zeros(5 * WHISPER_SAMPLE_RATE, dtype=np.float32)
+    for vad_filter in (True, False):
+        warmup_segments, _ = model.transcribe(warmup_audio, language=args.language, beam_size=5, vad_filter=vad_filter)
+        list(warmup_segments)
+    if args.batch_size > 1:
+        model = BatchedInferencePipeline(model=model)
+    logger.info("✅ Model Whisper berhasil dimuat.")
+
+    # Muat model summarization HANYA jika diperlukan
+    summarizer = None
+    if args.summarize:
+        logger.info("📥 Memuat model Summarization... Ini mungkin butuh waktu saat pertama kali.")
+        if args.summarizer_ct2_dir:
+            # Model T5 hasil konversi CTranslate2 (int8): decoder terfusi tanpa loop generate Python
+            summarizer = CT2Summarizer(args.summarizer_ct2_dir, device, device_index)
+        else:
+            # MODEL DIUBAH: Menggunakan model T5 yang tidak memerlukan sentencepiece secara eksplisit.
+            # bfloat16 di GPU yang mendukungnya (Ampere+). T5 tidak stabil di float16 (overflow),
+            # jadi GPU lama tetap memakai float32.
+            use_bf16 = device == "cuda" and torch.cuda.is_bf16_supported()
+            summarizer = pipeline(
+                "summarization",
+                model=SUMMARIZER_MODEL,
+                device=device_index if device == "cuda" else -1,
+                torch_dtype=torch.bfloat16 if use_bf16 else torch.float32,
+                batch_size=SUMMARIZER_BATCH_SIZE,
+            )
+            if device == "cpu":
+                # Kuantisasi dinamis INT8 pada layer Linear: GEMM di CPU dijalankan kernel int8 FBGEMM
+                # (memakai VNNI bila tersedia). Di GPU tetap bfloat16.
+                summarizer.model = torch.quantization.quantize_dynamic(summarizer.model, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                # Rekam encoder T5 sebagai CUDA graph; jika gagal (versi transformers/driver tertentu), tetap eager
+                try:
+                    summarizer.model.encoder = CUDAGraphEncoder(
+                        summarizer.model.encoder, SUMMARIZER_BATCH_SIZE, SUMMARIZER_MAX_INPUT_LENGTH,
+                        f"cuda:{device_index}", pad_token_id=summarizer.tokenizer.pad_token_id,
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ CUDA graph untuk encoder summarizer tidak aktif: {e}")
+        # Satu ringkasan pendek sebelum loop utama agar inisialisasi kernel tidak membebani file pertama
+        with torch.inference_mode():
+            summarizer(["warmup text " * 50], max_length=30, min_length=10, do_sample=False)
+        logger.info("✅ Model Summarization berhasil dimuat.")
+
+    return model, summarizer
+
+
+def process_files(args: argparse.Namespace, audio_files: list[str], model, summarizer, device: str, rank: int = 0, n_shards: int = 1) -> tuple[int, int]:
+    """
+    Menjalankan pembersihan noise, transkripsi, dan ringkasan untuk sekumpulan file.
+
+    Returns:
+        Tuple berisi (jumlah_berhasil, jumlah_gagal).
+    """
+    success_count = 0
+    failure_count = 0
+    cleaned_audio_folder = os.path.join(args.audio_folder, "cleaned")
+
+    # Pipeline tiga tahap: persiapan audio (decoding, pembersihan noise), transkripsi
+    # di thread utama agar model Whisper tetap di memori, lalu ringkasan + penulisan file di
+    # satu thread terpisah. Dengan begitu tahap-tahap tersebut berjalan bersamaan, bukan bergantian.
+    if device == "cpu" and args.clean_noise:
+        # nr.reduce_noise menahan GIL, jadi butuh proses terpisah. Setiap worker "spawn" mengimpor
+        # ulang seluruh modul ini (torch, transformers, ctranslate2, faster-whisper) dan memakan
+        # beberapa ratus MB, jadi jumlahnya dibatasi.
+        audio_workers = max(1, min(MAX_AUDIO_WORKERS, (os.cpu_count() or 2) // 2))
+        # "spawn" agar worker tidak mewarisi state thread dari proses utama
+        audio_pool = ProcessPoolExecutor(
+            max_workers=audio_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_audio_worker,
+        )
+    else:
+        # Decoding saja (soundfile/PyAV melepas GIL) atau TorchGate di GPU yang sama: satu thread
+        # cukup, dan audio tidak perlu di-pickle antarproses
+        audio_workers = 1
+        audio_pool = ThreadPoolExecutor(max_workers=audio_workers)
+    with audio_pool, ThreadPoolExecutor(max_workers=1) as summary_pool:
+        # File yang transkripnya sudah ada tidak perlu didekode atau dibersihkan lagi
+        existing_files = []
+        audio_jobs = []
+        for filename in audio_files:
+            if os.path.exists(get_output_path(filename, args.output_folder)):
+                existing_files.append(filename)
+                continue
+            audio_jobs.append((filename, (
+                os.path.join(args.audio_folder, filename), cleaned_audio_folder,
+                device, args.clean_noise, args.keep_cleaned,
+            )))
+        # Transkripsi dimulai dari file yang paling dulu selesai disiapkan
+        ready_files = itertools.chain(
+            ((filename, None) for filename in existing_files),
+            iter_prefetched(audio_pool, prepare_audio, audio_jobs, max_pending=2 * audio_workers),
+        )
+
+        desc = f"GPU {rank}" if n_shards > 1 else "Proses Total"
+        summary_futures = []
+        for filename, audio_future in tqdm(ready_files, total=len(audio_files), desc=desc, unit="file", position=rank, mininterval=0.5, miniters=1):
+            file_path = os.path.join(args.audio_folder, filename)
+            prepared_audio = None
+
+            if audio_future is not None:
+                try:
+                    prepared_audio = audio_future.result()
+                except Exception as e:
+                    tqdm.write(f"⚠️ Gagal menyiapkan audio untuk {filename}: {e}. Melanjutkan dengan file asli.")
+
+            # Lakukan transkripsi
+            # Jika summarize aktif, file ditulis sekali saja setelah ringkasan selesai
+            success, output_path, transcribed_text, formatted_transcription, has_summary = transcribe_audio(
+                model, file_path, args.output_folder, args.language, args.batch_size,
+                audio=prepared_audio, save=not args.summarize,
+            )
+
+            if success:
+                success_count += 1
+                # Jika opsi summarize aktif, ringkasan belum ada (atau basi), dan ada teks untuk diringkas
+                if args.summarize and not has_summary:
+                    if transcribed_text:
+                        summary_futures.append(summary_pool.submit(summarize_and_save, output_path, transcribed_text, formatted_transcription, summarizer))
+                    else:
+                        write_transcript(output_path, formatted_transcription)
+            else:
+                failure_count += 1
+
+        # Tunggu semua ringkasan selesai ditulis sebelum melaporkan hasil
+        for future in summary_futures:
+            future.result()
+
+    return success_count, failure_count
+
+
+def gpu_worker(rank: int, args: argparse.Namespace, audio_files: list[str], n_gpus: int, result_queue) -> None:
+    """
+    Worker untuk satu GPU: memuat model sendiri di cuda:{rank} dan memproses shard file audio_files[rank::n_gpus].
+    Hasil (jumlah_berhasil, jumlah_gagal) dikirim lewat result_queue.
+    """
+    configure_logging()
+    torch.cuda.set_device(rank)
+    model, summarizer = load_models(args, "cuda", device_index=rank)
+    result_queue.put(process_files(args, audio_files[rank::n_gpus], model, summarizer, f"cuda:{rank}", rank=rank, n_shards=n_gpus))
 
 
 def main():
@@ -91,94 +629,63 @@ def main():
     parser.add_argument("--output_folder", type=str, default="transkrip", help="Folder untuk menyimpan hasil.")
     parser.add_argument("--model", type=str, default="medium", choices=['tiny', 'base', 'small', 'medium', 'large'], help="Ukuran model Whisper.")
     parser.add_argument("--language", type=str, default="id", help="Kode bahasa audio (default: 'id').")
+    parser.add_argument("--flash_attention", action='store_true', help="Gunakan Flash Attention pada model Whisper (hanya GPU Ampere ke atas).")
     parser.add_argument("--clean_noise", action='store_true', help="Aktifkan pembersihan noise sebelum transkripsi.")
+    parser.add_argument("--keep_cleaned", action='store_true', help="Simpan audio hasil pembersihan noise ke folder 'cleaned'.")
     parser.add_argument("--summarize", action='store_true', help="Aktifkan pembuatan ringkasan setelah transkripsi.")
+    parser.add_argument("--summarizer_ct2_dir", type=str, default=None, help="Folder model summarization hasil konversi CTranslate2 (ct2-transformers-converter). Jika diisi, dipakai menggantikan pipeline transformers.")
+    parser.add_argument("--batch_size", type=int, default=16, help="Jumlah potongan VAD per batch encoder. Turunkan jika VRAM tidak cukup. Mode batch tidak memakai fallback temperature dan tidak mengondisikan pada teks sebelumnya (condition_on_previous_text=False); 1 = tanpa batching, hasil sama seperti decoding berurutan.")
     
     args = parser.parse_args()
+    configure_logging()
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"🚀 Menggunakan perangkat: {device.upper()}")
-
-    print(f"📥 Memuat model Whisper ({args.model})...")
-    model = whisper.load_model(args.model, device=device)
-    print("✅ Model Whisper berhasil dimuat.")
-
-    # Muat model summarization HANYA jika diperlukan
-    summarizer = None
-    if args.summarize:
-        print("📥 Memuat model Summarization... Ini mungkin butuh waktu saat pertama kali.")
-        # MODEL DIUBAH: Menggunakan model T5 yang tidak memerlukan sentencepiece secara eksplisit.
-        summarizer = pipeline("summarization", model="Falconsai/text_summarization", device=0 if device == "cuda" else -1)
-        print("✅ Model Summarization berhasil dimuat.")
+    logger.info(f"🚀 Menggunakan perangkat: {device.upper()}")
 
     if not os.path.isdir(args.audio_folder):
-        print(f"❌ Error: Folder audio '{args.audio_folder}' tidak ditemukan.")
+        logger.error(f"❌ Error: Folder audio '{args.audio_folder}' tidak ditemukan.")
         return
 
     os.makedirs(args.output_folder, exist_ok=True)
     
     cleaned_audio_folder = os.path.join(args.audio_folder, "cleaned")
-    if args.clean_noise:
+    if args.clean_noise and args.keep_cleaned:
         os.makedirs(cleaned_audio_folder, exist_ok=True)
 
-    SUPPORTED_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.mp4', '.mov', '.avi', '.mkv')
-    audio_files = [f for f in os.listdir(args.audio_folder) if f.lower().endswith(SUPPORTED_EXTENSIONS)]
+    SUPPORTED_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.mp4', '.mov', '.avi', '.mkv'}
+    # os.scandir membawa tipe entri dari getdents, jadi is_file() tidak butuh stat tambahan
+    with os.scandir(args.audio_folder) as entries:
+        audio_files = [
+            entry.name for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+        ]
 
     if not audio_files:
-        print(f"⚠️ Tidak ada file media yang didukung ditemukan di '{args.audio_folder}'.")
+        logger.warning(f"⚠️ Tidak ada file media yang didukung ditemukan di '{args.audio_folder}'.")
         return
         
-    print(f"\n🎧 Ditemukan {len(audio_files)} file untuk diproses.\n")
+    logger.info(f"\n🎧 Ditemukan {len(audio_files)} file untuk diproses.\n")
 
-    success_count = 0
-    failure_count = 0
+    n_gpus = torch.cuda.device_count() if device == "cuda" else 0
+    if n_gpus > 1:
+        # Data-parallel: satu proses per GPU, masing-masing dengan salinan model sendiri
+        logger.info(f"🚀 Membagi file ke {n_gpus} GPU.")
+        result_queue = torch.multiprocessing.get_context("spawn").SimpleQueue()
+        torch.multiprocessing.spawn(gpu_worker, args=(args, audio_files, n_gpus, result_queue), nprocs=n_gpus)
+        success_count = 0
+        failure_count = 0
+        for _ in range(n_gpus):
+            shard_success, shard_failure = result_queue.get()
+            success_count += shard_success
+            failure_count += shard_failure
+    else:
+        model, summarizer = load_models(args, device)
+        success_count, failure_count = process_files(args, audio_files, model, summarizer, device)
 
-    for filename in tqdm(audio_files, desc="Proses Total", unit="file"):
-        file_path_original = os.path.join(args.audio_folder, filename)
-        file_to_transcribe = file_path_original
-
-        if args.clean_noise:
-            # ... (logika pembersihan noise tetap sama) ...
-            try:
-                base_name_no_ext = os.path.splitext(filename)[0]
-                cleaned_audio_path = os.path.join(cleaned_audio_folder, f"{base_name_no_ext}_cleaned.wav")
-                if not os.path.exists(cleaned_audio_path):
-                    data, rate = sf.read(file_path_original)
-                    if data.ndim > 1:
-                        data = data.mean(axis=1)
-                    reduced_noise_data = nr.reduce_noise(y=data, sr=rate)
-                    sf.write(cleaned_audio_path, reduced_noise_data, rate)
-                file_to_transcribe = cleaned_audio_path
-            except Exception as e:
-                print(f"\n⚠️ Gagal membersihkan noise untuk {filename}: {e}. Melanjutkan dengan file asli.")
-
-        # Lakukan transkripsi
-        success, output_path, transcribed_text = transcribe_audio(model, file_to_transcribe, args.output_folder, args.language)
-
-        if success:
-            success_count += 1
-            # Jika opsi summarize aktif dan ada teks untuk diringkas
-            if args.summarize and transcribed_text:
-                # Baca kembali konten asli (hanya transkrip)
-                with open(output_path, 'r', encoding='utf-8') as f:
-                    original_content = f.read()
-
-                # Buat ringkasan
-                summary = summarize_text(transcribed_text, summarizer)
-                
-                # Tulis ulang file dengan format baru: ringkasan + transkrip
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write("--- RINGKASAN ---\n")
-                    f.write(summary + "\n\n")
-                    f.write("--- TRANSKRIPSI LENGKAP ---\n")
-                    f.write(original_content)
-        else:
-            failure_count += 1
-            
-    print("\n--- ✨ Proses Selesai ✨ ---")
-    print(f"Berhasil: {success_count} file")
-    print(f"Gagal: {failure_count} file")
-    print(f"Hasil disimpan di folder: '{args.output_folder}'")
+    logger.info("\n--- ✨ Proses Selesai ✨ ---")
+    logger.info(f"Berhasil: {success_count} file")
+    logger.info(f"Gagal: {failure_count} file")
+    logger.info(f"Hasil disimpan di folder: '{args.output_folder}'")
 
 
 if __name__ == "__main__":